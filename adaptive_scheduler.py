@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Adaptive scheduling for the cron wrapper.
+
+Cron fires `run_call_report.sh` on a short fixed tick; the wrapper asks this
+script whether a full (browser + OTP) run is due. The decision is learned from
+the dedup results of previous runs and the call volume seen at each hour of
+the day, bounded by configurable freshness SLOs.
+
+Only the standard library (plus `config`, which treats python-dotenv as
+optional) is used so the check runs before the venv is set up.
+"""
+
+import os
+import sys
+import json
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from config import load_settings
+
+# Exit code telling the cron wrapper to skip this tick
+EXIT_SKIP = 3
+
+# Weight of the newest observation in the per-hour volume average
+VOLUME_SMOOTHING = 0.3
+
+
+def _parse_range(value: str, upper: int) -> set:
+    """Parse '8-18' or '0,1,2' style ranges into a set of ints (end exclusive for hours)"""
+    result = set()
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = (int(x) for x in part.split('-', 1))
+            result.update(range(start, min(end, upper)))
+        else:
+            result.add(int(part))
+    return result
+
+
+class AdaptiveScheduler:
+    def __init__(self, state_path: Optional[str] = None):
+        # Persistent schedule state file (project-local)
+        self.state_path = state_path or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schedule_state.json')
+        settings = load_settings()
+        self.min_interval = timedelta(minutes=settings.schedule_min_interval_minutes)
+        self.business_slo = timedelta(minutes=settings.schedule_business_slo_minutes)
+        self.off_hours_slo = timedelta(minutes=settings.schedule_off_hours_slo_minutes)
+        self.failure_retry = timedelta(minutes=settings.schedule_failure_retry_minutes)
+        # Business hours are [start, end) in local time; days use Monday=0
+        self.business_hours = _parse_range(settings.schedule_business_hours, 24)
+        self.business_days = _parse_range(settings.schedule_business_days, 7)
+        self.state = self._load_state()
+
+    def _load_state(self) -> Dict:
+        """Load previous run history"""
+        try:
+            if os.path.exists(self.state_path):
+                with open(self.state_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    data.setdefault('hourly_volume', {})
+                    data.setdefault('quiet_streak', 0)
+                    return data
+        except Exception as e:
+            print(f"❌ Error loading schedule state: {str(e)}")
+        return {'hourly_volume': {}, 'quiet_streak': 0}
+
+    def _save_state(self) -> None:
+        """Persist run history and the next due time"""
+        try:
+            with open(self.state_path, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            print(f"❌ Error saving schedule state: {str(e)}")
+
+    def is_business_time(self, when: datetime) -> bool:
+        return when.weekday() in self.business_days and when.hour in self.business_hours
+
+    def _next_business_start(self, when: datetime) -> Optional[datetime]:
+        """First business-hours moment after `when` within the coming week"""
+        candidate = when.replace(minute=0, second=0, microsecond=0)
+        for _ in range(24 * 7):
+            candidate += timedelta(hours=1)
+            if self.is_business_time(candidate):
+                return candidate
+        return None
+
+    def _expected_volume(self, when: datetime) -> float:
+        return float(self.state['hourly_volume'].get(str(when.hour), 0.0))
+
+    def compute_interval(self, now: datetime, new_count: int) -> timedelta:
+        """Pick the wait until the next run from recent results and learned hourly volume"""
+        slo = self.business_slo if self.is_business_time(now) else self.off_hours_slo
+        if new_count > 0:
+            return self.min_interval
+
+        # Back off exponentially while runs keep coming back empty
+        interval = self.min_interval * (2 ** min(self.state['quiet_streak'], 10))
+        interval = min(interval, slo)
+
+        # Hours that usually see calls get polled proportionally more often
+        expected = self._expected_volume(now + interval)
+        if expected > 0:
+            interval = min(interval, max(self.min_interval, slo / (1 + expected)))
+        return interval
+
+    def record_run(self, new_count: int, duplicate_count: int = 0, now: Optional[datetime] = None) -> datetime:
+        """Learn from a completed run and schedule the next one"""
+        now = now or datetime.now()
+        hour = str(now.hour)
+        previous = float(self.state['hourly_volume'].get(hour, new_count))
+        self.state['hourly_volume'][hour] = round(
+            VOLUME_SMOOTHING * new_count + (1 - VOLUME_SMOOTHING) * previous, 3
+        )
+        self.state['quiet_streak'] = 0 if new_count > 0 else self.state['quiet_streak'] + 1
+
+        next_run = now + self.compute_interval(now, new_count)
+        # Never sleep past the start of business hours
+        if not self.is_business_time(now):
+            business_start = self._next_business_start(now)
+            if business_start and business_start < next_run:
+                next_run = business_start
+
+        self.state['last_run'] = now.isoformat()
+        self.state['last_result'] = {'new': new_count, 'duplicates': duplicate_count}
+        self.state['next_run'] = next_run.isoformat()
+        self._save_state()
+        print(f"🗓️ Next run scheduled for {next_run.strftime('%Y-%m-%d %H:%M')} ({new_count} new this run)")
+        return next_run
+
+    def record_failure(self, now: Optional[datetime] = None) -> datetime:
+        """Retry a failed run after a short delay without touching learned volume"""
+        now = now or datetime.now()
+        next_run = now + self.failure_retry
+        self.state['last_failure'] = now.isoformat()
+        self.state['next_run'] = next_run.isoformat()
+        self._save_state()
+        print(f"🗓️ Run failed, retrying at {next_run.strftime('%Y-%m-%d %H:%M')}")
+        return next_run
+
+    def should_run(self, now: Optional[datetime] = None) -> bool:
+        """Whether a full run is due"""
+        now = now or datetime.now()
+        next_run = self.state.get('next_run')
+        if not next_run:
+            return True
+        try:
+            return now >= datetime.fromisoformat(next_run)
+        except ValueError:
+            return True
+
+
+def main():
+    """Command line entry point used by run_call_report.sh"""
+    command = sys.argv[1] if len(sys.argv) > 1 else 'check'
+    scheduler = AdaptiveScheduler()
+    now = datetime.now()
+
+    if command == 'check':
+        if scheduler.should_run(now):
+            print(f"{now.isoformat()} ✅ Run due")
+            sys.exit(0)
+        print(f"{now.isoformat()} ⏭️ Skipping, next run at {scheduler.state.get('next_run')}")
+        sys.exit(EXIT_SKIP)
+    elif command == 'status':
+        print(json.dumps(scheduler.state, indent=2, ensure_ascii=False))
+    else:
+        print(f"Usage: {os.path.basename(sys.argv[0])} [check|status]")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
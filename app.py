@@ -5,35 +5,27 @@ Simple Email Retrieval Script for Security Code Emails
 
 import json
 import logging
-import requests
-import re
 import os
-from msal import ConfidentialClientApplication
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from config import load_settings, configure_logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Configuration from environment variables
-CONFIG = {
-    "client_id": os.getenv('CLIENT_ID'),
-    "client_secret": os.getenv('CLIENT_SECRET'),
-    "authority": f"https://login.microsoftonline.com/{os.getenv('TENANT_ID')}",
-    "scope": ["https://graph.microsoft.com/.default"],
-    "username": os.getenv('USER_EMAIL')
-}
-
-# Validate required environment variables
-required_vars = ['CLIENT_ID', 'CLIENT_SECRET', 'TENANT_ID', 'USER_EMAIL']
-missing_vars = [var for var in required_vars if not os.getenv(var)]
-if missing_vars:
-    logger.warning(f"⚠️ Missing environment variables: {', '.join(missing_vars)}. Using default values.")
-else:
-    logger.info("✅ All required environment variables loaded successfully")
+GRAPH_SCOPE = ["https://graph.microsoft.com/.default"]
+
+def validate_config():
+    """Log whether the Microsoft Graph environment variables are present"""
+    missing_vars = load_settings().missing_graph_vars()
+    if missing_vars:
+        logger.warning(f"⚠️ Missing environment variables: {', '.join(missing_vars)}. Using default values.")
+    else:
+        logger.info("✅ All required environment variables loaded successfully")
+    return not missing_vars
 
 # Target email senders and subject
 TARGET_SENDERS = [
@@ -44,36 +36,51 @@ TARGET_SUBJECT = "Login security code"
 
 def authenticate():
     """Authenticate with Microsoft Graph API"""
+    token, _ = authenticate_with_expiry()
+    return token
+
+def authenticate_with_expiry():
+    """Authenticate with Microsoft Graph API, returning the token and its lifetime in seconds"""
+    from msal import ConfidentialClientApplication
+    
+    settings = load_settings()
     app = ConfidentialClientApplication(
-        client_id=CONFIG['client_id'],
-        client_credential=CONFIG['client_secret'],
-        authority=CONFIG['authority']
+        client_id=settings.client_id,
+        client_credential=settings.client_secret,
+        authority=settings.graph_authority
     )
     
-    result = app.acquire_token_for_client(scopes=CONFIG['scope'])
+    result = app.acquire_token_for_client(scopes=GRAPH_SCOPE)
     
     if "access_token" in result:
         logger.info("Authentication successful")
-        return result['access_token']
+        return result['access_token'], int(result.get('expires_in', 0))
     else:
         logger.error(f"Authentication failed: {result.get('error_description', 'Unknown error')}")
-        return None
+        return None, 0
 
-def get_security_code_emails(access_token):
-    """Get security code emails from specific senders"""
+def get_security_code_emails(access_token, since=None):
+    """Get security code emails from specific senders, optionally only those received since a UTC datetime"""
+    import requests
+    
     headers = {
         'Authorization': f'Bearer {access_token}',
         'Content-Type': 'application/json'
     }
     
     # Get last 20 emails without complex filtering
-    endpoint = f"https://graph.microsoft.com/v1.0/users/{CONFIG['username']}/messages"
+    endpoint = f"https://graph.microsoft.com/v1.0/users/{load_settings().user_email}/messages"
     
     params = {
         '$orderby': 'receivedDateTime desc',
         '$top': 20,
-        '$expand': 'attachments'
     }
+    if since is not None:
+        # Narrow the scan to the window the broker is waiting on
+        params['$filter'] = f"receivedDateTime ge {since.strftime('%Y-%m-%dT%H:%M:%SZ')}"
+        params['$select'] = 'id,receivedDateTime,subject,bodyPreview,from,toRecipients'
+    else:
+        params['$expand'] = 'attachments'
     
     logger.info("Getting last 20 emails...")
     
@@ -200,8 +207,229 @@ def get_latest_otp():
         print(f"❌ Error getting latest OTP: {e}")
         return None
 
+def parse_received_datetime(value):
+    """Parse a Graph receivedDateTime string into an aware UTC datetime"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+class OtpBroker:
+    """Mailbox watcher that hands out OTP codes to concurrent logins.
+    
+    Each login registers a request tagged with its account and the time the code
+    was requested. A background thread polls the mailbox while requests are
+    pending and assigns every security code email to the oldest matching request
+    (same recipient, allowed sender, received no earlier than the request minus
+    the allowed clock skew). A message is handed out at most once.
+    
+    Pending requests and assignments live in a shared state file guarded by a
+    file lock (POSIX), and assignment always considers the requests of every
+    process. Separate processes logging in to the same account (e.g. one cron
+    run per location) therefore get codes in request order, whichever process
+    happens to poll first; a process picks up codes assigned to it by another
+    process on its next poll.
+    """
+    
+    def __init__(self, poll_interval=5, clock_skew=10, claims_path=None):
+        self.poll_interval = poll_interval
+        # Tolerated difference between the local clock and the mail server's timestamps
+        self.clock_skew = timedelta(seconds=clock_skew)
+        # Shared requests and claimed messages (project-local)
+        self.claims_path = claims_path or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'otp_claims.json')
+        self._lock = threading.Lock()
+        self._waiters = {}
+        self._watcher = None
+        self._token = None
+        self._token_expires = 0
+    
+    def _get_token(self):
+        """Reuse the Graph token across polls until shortly before it expires"""
+        if self._token and time.time() < self._token_expires:
+            return self._token
+        token, expires_in = authenticate_with_expiry()
+        if token:
+            self._token = token
+            # Refresh a minute before MSAL's reported expiry
+            self._token_expires = time.time() + max(expires_in - 60, 0)
+        return token
+    
+    def _read_shared_state(self):
+        """Load the shared state, dropping expired requests and day-old claims"""
+        state = None
+        if os.path.exists(self.claims_path):
+            try:
+                with open(self.claims_path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = None
+        if not isinstance(state, dict) or not isinstance(state.get('claims'), dict) or not isinstance(state.get('requests'), dict):
+            state = {'claims': {}, 'requests': {}}
+        
+        now = datetime.now(timezone.utc)
+        state['requests'] = {
+            rid: r for rid, r in state['requests'].items()
+            if r.get('expires_at', '') >= now.isoformat()
+        }
+        # OTP emails are long expired after a day
+        cutoff = (now - timedelta(days=1)).isoformat()
+        state['claims'] = {
+            mid: c for mid, c in state['claims'].items()
+            if c.get('claimed_at', '') >= cutoff
+        }
+        return state
+    
+    @contextmanager
+    def _shared_state(self):
+        """Lock, load and (on success) save the state shared between processes"""
+        import fcntl
+        
+        with open(self.claims_path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                state = self._read_shared_state()
+                yield state
+                with open(self.claims_path, 'w', encoding='utf-8') as f:
+                    json.dump(state, f, indent=2)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def request_otp(self, account, requested_at=None, sender=None, timeout=120):
+        """Block until an OTP addressed to `account` arrives after `requested_at`, or timeout"""
+        if not account:
+            # An empty recipient would match every email and reintroduce cross-talk
+            raise ValueError("❌ An OTP recipient address is required (set OTP_RECIPIENT or TIDYYOURSALES_EMAIL)")
+        if requested_at is None:
+            requested_at = datetime.now(timezone.utc)
+        # Shared requests are ordered by their ISO string, so keep them all in UTC
+        requested_at = requested_at.astimezone(timezone.utc)
+        request_id = uuid.uuid4().hex
+        waiter = {
+            "account": account.lower(),
+            "requested_at": requested_at,
+            "code": None,
+            "event": threading.Event(),
+        }
+        
+        with self._lock:
+            with self._shared_state() as state:
+                state['requests'][request_id] = {
+                    "account": account.lower(),
+                    "sender": sender.lower() if sender else None,
+                    "requested_at": requested_at.isoformat(),
+                    "expires_at": (datetime.now(timezone.utc) + timedelta(seconds=timeout)).isoformat(),
+                }
+            self._waiters[request_id] = waiter
+            if self._watcher is None or not self._watcher.is_alive():
+                self._watcher = threading.Thread(target=self._watch, name="otp-broker", daemon=True)
+                self._watcher.start()
+        
+        logger.info(f"OTP requested for {account} at {requested_at.isoformat()}")
+        if not waiter["event"].wait(timeout):
+            with self._lock:
+                self._waiters.pop(request_id, None)
+                with self._shared_state() as state:
+                    state['requests'].pop(request_id, None)
+                    # A code may have been assigned just before the timeout
+                    for claim in state['claims'].values():
+                        if claim.get('request_id') == request_id:
+                            waiter["code"] = claim.get('code')
+            if waiter["code"] is None:
+                logger.warning(f"Timed out waiting for OTP for {account}")
+        return waiter["code"]
+    
+    def _matches(self, request, email, received):
+        """Check whether an email can satisfy a pending request"""
+        from_addr = email.get('from', {}).get('emailAddress', {}).get('address', '').lower()
+        recipients = [
+            r.get('emailAddress', {}).get('address', '').lower()
+            for r in email.get('toRecipients', [])
+        ]
+        if request.get("sender") and from_addr != request["sender"]:
+            return False
+        if request["account"] not in recipients:
+            return False
+        # receivedDateTime has whole-second precision and comes from the mail server's clock
+        requested_at = datetime.fromisoformat(request["requested_at"]).replace(microsecond=0)
+        return received >= requested_at - self.clock_skew
+    
+    def _dispatch(self, emails):
+        """Assign unclaimed emails (oldest first) to the oldest matching request of any process,
+        then deliver codes assigned to this process's waiters"""
+        emails = sorted(emails, key=lambda x: x.get('receivedDateTime', ''))
+        with self._lock, self._shared_state() as state:
+            claims = state['claims']
+            assigned = {c.get('request_id') for c in claims.values()}
+            pending = sorted(
+                ((rid, r) for rid, r in state['requests'].items() if rid not in assigned),
+                key=lambda item: item[1]["requested_at"]
+            )
+            
+            for email in emails:
+                message_id = email.get('id')
+                received = parse_received_datetime(email.get('receivedDateTime'))
+                if not message_id or message_id in claims or received is None:
+                    continue
+                otp_code = extract_otp_code(email.get('bodyPreview', ''))
+                if not otp_code:
+                    continue
+                for rid, request in pending:
+                    if self._matches(request, email, received):
+                        claims[message_id] = {
+                            "request_id": rid,
+                            "code": otp_code,
+                            "claimed_at": datetime.now(timezone.utc).isoformat(),
+                        }
+                        pending.remove((rid, request))
+                        break
+            
+            for message_id, claim in claims.items():
+                waiter = self._waiters.pop(claim.get('request_id'), None)
+                if waiter is None:
+                    continue
+                state['requests'].pop(claim['request_id'], None)
+                waiter["code"] = claim.get('code')
+                waiter["event"].set()
+                logger.info(f"OTP delivered to request for {waiter['account']} (message {message_id})")
+    
+    def _watch(self):
+        """Poll the mailbox while there are pending requests"""
+        while True:
+            with self._lock:
+                if not self._waiters:
+                    self._watcher = None
+                    return
+                since = min(w["requested_at"] for w in self._waiters.values()) - self.clock_skew
+            
+            try:
+                token = self._get_token()
+                # Still dispatch without a token to pick up codes assigned by other processes
+                self._dispatch(get_security_code_emails(token, since=since) if token else [])
+            except Exception as e:
+                logger.error(f"OTP broker poll failed: {e}")
+            
+            time.sleep(self.poll_interval)
+
+_otp_broker = None
+_otp_broker_lock = threading.Lock()
+
+def get_otp_broker():
+    """Return the process-wide OTP broker"""
+    global _otp_broker
+    with _otp_broker_lock:
+        if _otp_broker is None:
+            settings = load_settings()
+            validate_config()
+            _otp_broker = OtpBroker(
+                poll_interval=settings.otp_poll_interval,
+                clock_skew=settings.otp_clock_skew
+            )
+        return _otp_broker
+
 def main():
     """Main function - get latest OTP code only"""
+    configure_logging()
+    validate_config()
     print("🔍 Getting latest OTP code from security emails...")
     
     latest_otp = get_latest_otp()
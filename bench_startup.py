@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for the command line entry points.
+
+Runs each short command several times in a fresh interpreter and reports the
+median wall time next to a bare `python -c pass` baseline, plus the modules
+each command ends up importing. Heavy dependencies (playwright, msal,
+requests) should only show up for commands that actually need them.
+
+Usage: python bench_startup.py [--runs N]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+HEAVY_MODULES = ['playwright', 'msal', 'requests', 'dotenv']
+
+# Sample export copied into the temporary reports folder for `send`
+SAMPLE_CSV = os.path.join(PROJECT_DIR, 'reports', 'call-reporting-2025-10-01_02-18-39.csv')
+
+# Runs `send` end to end with the webhook POST stubbed out and the dedup state
+# kept in memory, so every run parses, encodes and "sends" the whole sample
+SEND_STUBBED = (
+    "import sys, types, requests, report_sender, login_automation; "
+    "requests.post = lambda *a, **k: types.SimpleNamespace(status_code=200, text='stubbed'); "
+    "report_sender.CallReportSender._load_dedup_state = lambda self: set(); "
+    "report_sender.CallReportSender._save_dedup_state = lambda self, ids: None; "
+    "sys.exit(0 if login_automation.main(['send']) else 1)"
+)
+
+COMMANDS = [
+    ("baseline (python -c pass)", ['-c', 'pass']),
+    ("login_automation.py --help", ['login_automation.py', '--help']),
+    ("login_automation.py check", ['login_automation.py', 'check']),
+    ("send (sample CSV, POST stubbed)", ['-c', SEND_STUBBED]),
+    ("adaptive_scheduler.py status", ['adaptive_scheduler.py', 'status']),
+    ("import login_automation", ['-c', 'import login_automation']),
+]
+
+# Prints which heavy modules were imported once the command has finished
+IMPORT_PROBE = (
+    "import atexit, sys; "
+    "atexit.register(lambda: print('HEAVY=' + ','.join(sorted("
+    "m for m in {heavy!r} if m in sys.modules)), file=sys.stderr))"
+)
+
+
+def time_command(args, runs, env):
+    """Return the median wall time in milliseconds over `runs` executions"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=PROJECT_DIR, env=env,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def heavy_imports(args, env):
+    """Return the heavy dependencies a command imports"""
+    probe = IMPORT_PROBE.format(heavy=HEAVY_MODULES)
+    if args[0] == '-c':
+        wrapped = ['-c', f"{probe}; {args[1]}"]
+    else:
+        # Run the script as __main__ after installing the probe
+        wrapped = ['-c', f"{probe}; import runpy; sys.argv = {args!r}; runpy.run_path({args[0]!r}, run_name='__main__')"]
+    result = subprocess.run([sys.executable] + wrapped, cwd=PROJECT_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    for line in result.stderr.splitlines():
+        if line.startswith('HEAVY='):
+            return line[len('HEAVY='):] or '-'
+    return '?'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark command startup time")
+    parser.add_argument('--runs', type=int, default=10, help="Executions per command (default: 10)")
+    args = parser.parse_args()
+
+    print(f"⏱️ Startup benchmark ({args.runs} runs each, median)")
+    baseline = None
+    # `send` reads a copy of the sample export so the real reports folder and
+    # dedup state are left alone
+    reports_dir = tempfile.mkdtemp(prefix='bench_reports_')
+    shutil.copy(SAMPLE_CSV, reports_dir)
+    env = dict(os.environ, REPORTS_FOLDER=reports_dir, N8N_WEBHOOK_URL='http://localhost/bench')
+    try:
+        for label, command in COMMANDS:
+            median_ms = time_command(command, args.runs, env)
+            if baseline is None:
+                baseline = median_ms
+                print(f"  {label:<32} {median_ms:8.1f} ms")
+                continue
+            print(f"  {label:<32} {median_ms:8.1f} ms  (+{median_ms - baseline:.1f} ms)  heavy imports: {heavy_imports(command, env)}")
+    finally:
+        shutil.rmtree(reports_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
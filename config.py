@@ -0,0 +1,122 @@
+"""
+Typed configuration shared by all modules.
+
+Settings are read from the environment (and `.env`, when python-dotenv is
+available) once, on first use, instead of at import time in every module.
+"""
+
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+# Variables needed for Microsoft Graph OTP retrieval
+GRAPH_REQUIRED_VARS = ['CLIENT_ID', 'CLIENT_SECRET', 'TENANT_ID', 'USER_EMAIL']
+
+
+def _get_bool(name: str, default: str = 'false') -> bool:
+    return os.getenv(name, default).strip().lower() == 'true'
+
+
+def _get_int(name: str, default: int) -> int:
+    value = os.getenv(name, '').strip()
+    return int(value) if value else default
+
+
+@dataclass(frozen=True)
+class Settings:
+    # TidyYourSales login
+    tidyyoursales_email: Optional[str]
+    tidyyoursales_password: Optional[str]
+    login_url: str
+    target_url: Optional[str]
+    browser_headless: bool
+
+    # Microsoft Graph (email OTP)
+    tenant_id: Optional[str]
+    client_id: Optional[str]
+    client_secret: Optional[str]
+    user_email: Optional[str]
+    otp_recipient: str
+    otp_timeout: int
+    otp_poll_interval: int
+    otp_clock_skew: int
+
+    # Reports & webhook
+    reports_folder: str
+    n8n_webhook_url: Optional[str]
+    webhook_payload_format: str
+    webhook_fields: Tuple[str, ...]
+    webhook_typed_values: bool
+
+    # Adaptive scheduling (SCHEDULE_ADAPTIVE itself is read by run_call_report.sh)
+    schedule_business_hours: str
+    schedule_business_days: str
+    schedule_min_interval_minutes: int
+    schedule_business_slo_minutes: int
+    schedule_off_hours_slo_minutes: int
+    schedule_failure_retry_minutes: int
+
+    @classmethod
+    def from_env(cls) -> 'Settings':
+        email = os.getenv('TIDYYOURSALES_EMAIL')
+        return cls(
+            tidyyoursales_email=email,
+            tidyyoursales_password=os.getenv('TIDYYOURSALES_PASSWORD'),
+            login_url=os.getenv('TIDYYOURSALES_LOGIN_URL', 'https://app.tidyyoursales.com/'),
+            target_url=os.getenv('TIDYYOURSALES_TARGET_URL'),
+            browser_headless=_get_bool('BROWSER_HEADLESS'),
+            tenant_id=os.getenv('TENANT_ID'),
+            client_id=os.getenv('CLIENT_ID'),
+            client_secret=os.getenv('CLIENT_SECRET'),
+            user_email=os.getenv('USER_EMAIL'),
+            otp_recipient=os.getenv('OTP_RECIPIENT') or email or '',
+            otp_timeout=_get_int('OTP_TIMEOUT', 120),
+            otp_poll_interval=_get_int('OTP_POLL_INTERVAL', 5),
+            otp_clock_skew=_get_int('OTP_CLOCK_SKEW', 10),
+            reports_folder=os.getenv('REPORTS_FOLDER', 'reports'),
+            n8n_webhook_url=os.getenv('N8N_WEBHOOK_URL'),
+            webhook_payload_format=os.getenv('WEBHOOK_PAYLOAD_FORMAT', 'records').strip().lower(),
+            webhook_fields=tuple(f.strip() for f in os.getenv('WEBHOOK_FIELDS', '').split(',') if f.strip()),
+            webhook_typed_values=_get_bool('WEBHOOK_TYPED_VALUES'),
+            schedule_business_hours=os.getenv('SCHEDULE_BUSINESS_HOURS', '8-18'),
+            schedule_business_days=os.getenv('SCHEDULE_BUSINESS_DAYS', '0-5'),
+            schedule_min_interval_minutes=_get_int('SCHEDULE_MIN_INTERVAL_MINUTES', 10),
+            schedule_business_slo_minutes=_get_int('SCHEDULE_BUSINESS_SLO_MINUTES', 30),
+            schedule_off_hours_slo_minutes=_get_int('SCHEDULE_OFF_HOURS_SLO_MINUTES', 240),
+            schedule_failure_retry_minutes=_get_int('SCHEDULE_FAILURE_RETRY_MINUTES', 15),
+        )
+
+    @property
+    def graph_authority(self) -> str:
+        return f"https://login.microsoftonline.com/{self.tenant_id}"
+
+    def missing_graph_vars(self) -> List[str]:
+        values = {
+            'CLIENT_ID': self.client_id,
+            'CLIENT_SECRET': self.client_secret,
+            'TENANT_ID': self.tenant_id,
+            'USER_EMAIL': self.user_email,
+        }
+        return [name for name in GRAPH_REQUIRED_VARS if not values[name]]
+
+
+@lru_cache(maxsize=None)
+def load_settings() -> Settings:
+    """Load `.env` and build the settings object (once per process)"""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        # The cron wrapper exports .env itself; the stdlib-only scheduler check
+        # runs with the system python where python-dotenv may be missing
+        pass
+    else:
+        load_dotenv()
+    return Settings.from_env()
+
+
+def configure_logging() -> None:
+    """Configure the root logger for command line entry points"""
+    import logging
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
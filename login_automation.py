@@ -1,22 +1,23 @@
-import asyncio
+import argparse
+import sys
 import time
 import os
-from dotenv import load_dotenv
-from playwright.async_api import async_playwright
-from app import get_latest_otp
-from report_sender import CallReportSender
-
-# Load environment variables
-load_dotenv()
+from datetime import datetime, timezone
+from config import load_settings, configure_logging
+from adaptive_scheduler import AdaptiveScheduler
 
 class TidyYourSalesLogin:
     def __init__(self):
-        # Load credentials from environment variables
-        self.email = os.getenv('TIDYYOURSALES_EMAIL')
-        self.password = os.getenv('TIDYYOURSALES_PASSWORD')
-        self.login_url = os.getenv('TIDYYOURSALES_LOGIN_URL', 'https://app.tidyyoursales.com/')
-        self.target_url = os.getenv('TIDYYOURSALES_TARGET_URL')
-        self.headless = os.getenv('BROWSER_HEADLESS', 'false').lower() == 'true'
+        # Load credentials from settings
+        settings = load_settings()
+        self.email = settings.tidyyoursales_email
+        self.password = settings.tidyyoursales_password
+        self.login_url = settings.login_url
+        self.target_url = settings.target_url
+        self.headless = settings.browser_headless
+        self.otp_timeout = settings.otp_timeout
+        # Address the OTP email is sent to (used by the OTP broker to match codes to this login)
+        self.otp_recipient = settings.otp_recipient
         
         # Validate required credentials
         if not self.email or not self.password:
@@ -27,8 +28,18 @@ class TidyYourSalesLogin:
         print(f"🎯 Target URL: {self.target_url}")
         print(f"👁️ Headless mode: {self.headless}")
         
+        # Learned selectors for the reporting page UI steps
+        from selector_resolver import SelectorResolver
+        self.selector_resolver = SelectorResolver()
+        
     async def login_with_otp(self):
         """Automated login with OTP verification"""
+        # Heavy dependencies are only needed for the full browser run
+        import asyncio
+        from playwright.async_api import async_playwright
+        from app import get_otp_broker
+        from report_sender import CallReportSender
+        
         async with async_playwright() as p:
             # Launch browser
             browser = await p.chromium.launch(headless=self.headless)  # Use environment variable
@@ -56,16 +67,16 @@ class TidyYourSalesLogin:
                 
                 # Click "Send Security Code" button
                 print("📤 Clicking 'Send Security Code' button...")
+                otp_requested_at = datetime.now(timezone.utc)
                 await page.click('text=Send Security Code')
                 print("✅ Security code sent")
                 
-                # Wait 30 seconds for email to arrive
-                print("⏰ Waiting 30 seconds for email to arrive...")
-                await asyncio.sleep(30)
-                
-                # Get latest OTP from email
-                print("📧 Getting latest OTP from email...")
-                otp_code = get_latest_otp()
+                # Wait for the OTP broker to match the email to this login
+                print(f"📧 Waiting up to {self.otp_timeout} seconds for OTP email...")
+                loop = asyncio.get_running_loop()
+                otp_code = await loop.run_in_executor(
+                    None, get_otp_broker().request_otp, self.otp_recipient, otp_requested_at, None, self.otp_timeout
+                )
                 
                 if not otp_code:
                     print("❌ Failed to get OTP code")
@@ -119,14 +130,9 @@ class TidyYourSalesLogin:
                     '.n-date-picker'
                 ]
                 
-                date_picker = None
-                for selector in date_picker_selectors:
-                    try:
-                        date_picker = await page.wait_for_selector(selector, timeout=5000)
-                        print(f"✅ Found date picker with selector: {selector}")
-                        break
-                    except:
-                        continue
+                date_picker = await self.selector_resolver.resolve(
+                    page, 'call-reporting', 'date-picker', date_picker_selectors, timeout=5000
+                )
                 
                 if not date_picker:
                     print("❌ Could not find date picker element")
@@ -139,7 +145,7 @@ class TidyYourSalesLogin:
                 await asyncio.sleep(3)
                 
                 # Get today's date and yesterday's date
-                from datetime import datetime, timedelta
+                from datetime import timedelta
                 today = datetime.now()
                 yesterday = today - timedelta(days=1)
                 
@@ -158,17 +164,11 @@ class TidyYourSalesLogin:
                     '.date-input input'
                 ]
                 
-                # Fill start date
-                start_input = None
-                for selector in date_input_selectors:
-                    try:
-                        inputs = await page.query_selector_all(selector)
-                        if inputs:
-                            start_input = inputs[0]  # First input is usually start date
-                            print(f"✅ Found start date input with selector: {selector}")
-                            break
-                    except:
-                        continue
+                # Fill start date (first input is usually start date)
+                start_inputs = await self.selector_resolver.resolve_all(
+                    page, 'call-reporting', 'start-date-input', date_input_selectors, min_count=1
+                )
+                start_input = start_inputs[0] if start_inputs else None
                 
                 if start_input:
                     # Clear and fill start date
@@ -180,20 +180,11 @@ class TidyYourSalesLogin:
                 else:
                     print("❌ Could not find start date input")
                 
-                # Fill end date
-                end_input = None
-                for selector in date_input_selectors:
-                    try:
-                        inputs = await page.query_selector_all(selector)
-                        if len(inputs) > 1:
-                            end_input = inputs[1]  # Second input is usually end date
-                            print(f"✅ Found end date input with selector: {selector}")
-                            break
-                        elif len(inputs) == 1 and selector.find('End') != -1:
-                            end_input = inputs[0]
-                            break
-                    except:
-                        continue
+                # Fill end date (second input is usually end date)
+                end_inputs = await self.selector_resolver.resolve_all(
+                    page, 'call-reporting', 'end-date-input', date_input_selectors, min_count=2
+                )
+                end_input = end_inputs[1] if end_inputs else None
                 
                 if end_input:
                     # Clear and fill end date
@@ -222,14 +213,9 @@ class TidyYourSalesLogin:
                 
                 # Click confirm button
                 print("✅ Clicking confirm button...")
-                confirm_btn = None
-                for selector in confirm_selectors:
-                    try:
-                        confirm_btn = await page.wait_for_selector(selector, timeout=3000)
-                        print(f"✅ Found confirm button with selector: {selector}")
-                        break
-                    except:
-                        continue
+                confirm_btn = await self.selector_resolver.resolve(
+                    page, 'call-reporting', 'confirm-button', confirm_selectors, timeout=3000
+                )
                 
                 if confirm_btn:
                     await confirm_btn.click()
@@ -268,7 +254,7 @@ class TidyYourSalesLogin:
                 # Process and send reports to webhook
                 print("📊 Processing and sending reports to webhook...")
                 report_sender = CallReportSender()
-                webhook_success = report_sender.process_and_send_reports()
+                webhook_success = report_sender.process_and_send_reports(scheduler=AdaptiveScheduler())
                 
                 if webhook_success:
                     print("🎉 Reports successfully sent to n8n webhook!")
@@ -285,17 +271,87 @@ class TidyYourSalesLogin:
                 return False
                 
             finally:
+                self.selector_resolver.save_cache()
+                self.selector_resolver.print_stats()
                 await browser.close()
 
-async def main():
-    """Main function to run the login automation"""
+async def run_automation():
+    """Run the full login, download and webhook automation"""
     login_bot = TidyYourSalesLogin()
     success = await login_bot.login_with_otp()
     
     if success:
         print("✅ Login automation completed successfully!")
     else:
+        # Retry soon instead of waiting for the learned interval
+        AdaptiveScheduler().record_failure()
         print("❌ Login automation failed!")
+    return success
+
+def send_latest_reports():
+    """Process the latest downloaded CSV and send new records to the webhook"""
+    from report_sender import CallReportSender
+    
+    return CallReportSender().process_and_send_reports()
+
+def fetch_latest_otp():
+    """Print the latest OTP code from the mailbox"""
+    import app
+    
+    return app.main() is not None
+
+def check_config(auth=False):
+    """Report missing configuration and optionally verify Microsoft Graph authentication"""
+    settings = load_settings()
+    ok = True
+    
+    missing = [
+        name for name, value in [
+            ('TIDYYOURSALES_EMAIL', settings.tidyyoursales_email),
+            ('TIDYYOURSALES_PASSWORD', settings.tidyyoursales_password),
+            ('TIDYYOURSALES_TARGET_URL', settings.target_url),
+            ('N8N_WEBHOOK_URL', settings.n8n_webhook_url),
+        ] if not value
+    ] + settings.missing_graph_vars()
+    
+    if missing:
+        print(f"❌ Missing environment variables: {', '.join(missing)}")
+        ok = False
+    else:
+        print("✅ All required environment variables are set")
+    
+    if auth:
+        from app import authenticate
+        
+        if authenticate():
+            print("✅ Microsoft Graph authentication successful")
+        else:
+            print("❌ Microsoft Graph authentication failed")
+            ok = False
+    return ok
+
+def main(argv=None):
+    """Command line entry point; runs the full automation when no command is given"""
+    parser = argparse.ArgumentParser(description="TidyYourSales call report automation")
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('run', help="Log in, download the call report and send it (default)")
+    subparsers.add_parser('send', help="Send new records from the latest CSV in the reports folder")
+    subparsers.add_parser('otp', help="Print the latest OTP code from the mailbox")
+    check_parser = subparsers.add_parser('check', help="Check configuration")
+    check_parser.add_argument('--auth', action='store_true', help="Also verify Microsoft Graph authentication")
+    args = parser.parse_args(argv)
+    
+    configure_logging()
+    
+    if args.command == 'send':
+        return send_latest_reports()
+    if args.command == 'otp':
+        return fetch_latest_otp()
+    if args.command == 'check':
+        return check_config(auth=args.auth)
+    
+    import asyncio
+    return asyncio.run(run_automation())
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    sys.exit(0 if main() else 1)
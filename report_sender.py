@@ -1,28 +1,43 @@
 import os
 import csv
 import json
-import requests
 import hashlib
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-from dotenv import load_dotenv
+from typing import List, Dict, Optional, Tuple
+from config import load_settings
 
-# Load environment variables
-load_dotenv()
+# Supported webhook payload encodings
+PAYLOAD_FORMATS = ('records', 'columnar', 'ndjson')
+
+# Column typing used when WEBHOOK_TYPED_VALUES is enabled
+TIMESTAMP_FIELDS = {'Date & Time'}
+DURATION_FIELDS = {'Duration'}
+BOOLEAN_FIELDS = {'First Time', 'Qualified Lead'}
+NULL_VALUES = {'', '-'}
 
 class CallReportSender:
     def __init__(self):
-        self.reports_folder = os.getenv('REPORTS_FOLDER', 'reports')
-        self.webhook_url = os.getenv('N8N_WEBHOOK_URL')
+        settings = load_settings()
+        self.reports_folder = settings.reports_folder
+        self.webhook_url = settings.n8n_webhook_url
         # Persistent dedup state file (project-local)
         self.dedup_state_path = os.path.join(os.path.dirname(__file__), 'dedup_state.json')
+        # Webhook payload encoding
+        self.payload_format = settings.webhook_payload_format
+        self.payload_fields = list(settings.webhook_fields)
+        self.typed_values = settings.webhook_typed_values
         
         # Validate webhook URL
         if not self.webhook_url:
             raise ValueError("❌ N8N_WEBHOOK_URL must be set in environment variables")
         
+        # Validate payload format
+        if self.payload_format not in PAYLOAD_FORMATS:
+            raise ValueError(f"❌ WEBHOOK_PAYLOAD_FORMAT must be one of: {', '.join(PAYLOAD_FORMATS)}")
+        
         print(f"📁 Reports folder: {self.reports_folder}")
         print(f"🔗 Webhook URL: {self.webhook_url}")
+        print(f"📦 Payload format: {self.payload_format} (typed values: {self.typed_values})")
     
     def get_latest_csv_file(self) -> Optional[str]:
         """Find the latest CSV file in the reports folder"""
@@ -50,8 +65,8 @@ class CallReportSender:
             print(f"❌ Error finding latest CSV file: {str(e)}")
             return None
     
-    def parse_csv_data(self, file_path: str) -> List[Dict]:
-        """Parse CSV file and extract data"""
+    def parse_csv_data(self, file_path: str) -> Optional[List[Dict]]:
+        """Parse CSV file and extract data (empty list for a header-only export, None on error)"""
         try:
             reports = []
             
@@ -74,7 +89,7 @@ class CallReportSender:
             
         except Exception as e:
             print(f"❌ Error parsing CSV file: {str(e)}")
-            return []
+            return None
     
     def filter_latest_day_reports(self, reports: List[Dict]) -> List[Dict]:
         """Filter reports to get only the latest day's data"""
@@ -118,31 +133,102 @@ class CallReportSender:
             print(f"❌ Error filtering latest day reports: {str(e)}")
             return []
     
+    def _convert_value(self, field: str, value: str):
+        """Convert a raw CSV string into a typed JSON value"""
+        if value is None or value.strip() in NULL_VALUES:
+            return None
+        value = value.strip()
+        try:
+            if field in TIMESTAMP_FIELDS:
+                # The export carries no offset: times are in the location's local time zone
+                return datetime.strptime(value, '%Y-%m-%d %H:%M:%S').isoformat()
+            if field in DURATION_FIELDS:
+                # Durations come as MM:SS or HH:MM:SS
+                seconds = 0
+                for part in value.split(':'):
+                    seconds = seconds * 60 + int(part)
+                return seconds
+            if field in BOOLEAN_FIELDS:
+                if value.lower() in ('yes', 'true'):
+                    return True
+                if value.lower() in ('no', 'false'):
+                    return False
+        except ValueError:
+            pass
+        return value
+
+    def _prepare_records(self, reports: List[Dict]) -> Tuple[List[str], List[Dict]]:
+        """Apply field projection and typing, returning the column order and records"""
+        available = list(reports[0].keys())
+        for report in reports[1:]:
+            available.extend(k for k in report.keys() if k not in available)
+        
+        if self.payload_fields:
+            # Validate projected columns against the CSV header
+            unknown = [field for field in self.payload_fields if field not in available]
+            if unknown:
+                raise ValueError(
+                    f"❌ WEBHOOK_FIELDS contains unknown columns: {', '.join(unknown)} "
+                    f"(available: {', '.join(available)})"
+                )
+            columns = self.payload_fields
+        else:
+            columns = available
+        
+        records = []
+        for report in reports:
+            if self.typed_values:
+                record = {field: self._convert_value(field, report.get(field)) for field in columns}
+            else:
+                record = {field: report.get(field) for field in columns}
+            records.append(record)
+        return columns, records
+
+    def build_payload(self, reports: List[Dict]) -> Tuple[bytes, str]:
+        """Encode reports in the configured payload format, returning body and content type"""
+        columns, records = self._prepare_records(reports)
+        
+        if self.payload_format == 'ndjson':
+            lines = [json.dumps(record, ensure_ascii=False, separators=(',', ':')) for record in records]
+            return ('\n'.join(lines) + '\n').encode('utf-8'), 'application/x-ndjson'
+        
+        payload = {
+            "timestamp": datetime.now().isoformat(),
+            "total_reports": len(records),
+        }
+        if self.payload_format == 'columnar':
+            payload["format"] = "columnar"
+            payload["columns"] = columns
+            payload["rows"] = [[record[field] for field in columns] for record in records]
+            body = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+        else:
+            payload["reports"] = records
+            body = json.dumps(payload, ensure_ascii=False)
+        return body.encode('utf-8'), 'application/json'
+
     def send_to_webhook(self, reports: List[Dict]) -> bool:
         """Send reports to n8n webhook"""
+        import requests
+        
         try:
             if not reports:
                 print("❌ No reports to send")
                 return False
             
             # Prepare payload
-            payload = {
-                "timestamp": datetime.now().isoformat(),
-                "total_reports": len(reports),
-                "reports": reports
-            }
+            body, content_type = self.build_payload(reports)
             
-            print(f"📤 Sending {len(reports)} reports to webhook...")
+            print(f"📤 Sending {len(reports)} reports to webhook ({self.payload_format}, {len(body)} bytes)...")
             
             # Send POST request
             headers = {
-                'Content-Type': 'application/json',
+                'Content-Type': content_type,
                 'User-Agent': 'CallReportSender/1.0'
             }
             
             response = requests.post(
                 self.webhook_url,
-                json=payload,
+                data=body,
                 headers=headers,
                 timeout=30
             )
@@ -192,25 +278,41 @@ class CallReportSender:
         except Exception as e:
             print(f"❌ Error saving dedup state: {str(e)}")
 
-    def process_and_send_reports(self) -> bool:
-        """Main function to process CSV and send to webhook"""
+    def process_and_send_reports(self, scheduler=None) -> bool:
+        """Main function to process CSV and send to webhook.
+        
+        Pass an `AdaptiveScheduler` to record the outcome for adaptive
+        scheduling; manual runs leave the schedule untouched.
+        """
         try:
             print("🚀 Starting call report processing...")
             
             # Step 1: Find latest CSV file
             latest_file = self.get_latest_csv_file()
             if not latest_file:
+                if scheduler:
+                    scheduler.record_failure()
                 return False
             
             # Step 2: Parse CSV data
             all_reports = self.parse_csv_data(latest_file)
-            if not all_reports:
+            if all_reports is None:
+                if scheduler:
+                    scheduler.record_failure()
                 return False
+            if not all_reports:
+                # A header-only export means no calls in the selected range
+                print("ℹ️ No calls in the latest export")
+                if scheduler:
+                    scheduler.record_run(0, 0)
+                return True
             
             # Step 3: Filter for latest day
             latest_day_reports = self.filter_latest_day_reports(all_reports)
             if not latest_day_reports:
                 print("❌ No reports found for the latest day")
+                if scheduler:
+                    scheduler.record_failure()
                 return False
 
             # Step 3.5: Deduplicate against previously sent records
@@ -222,10 +324,13 @@ class CallReportSender:
                 if rid not in sent_ids:
                     new_reports.append(report)
                     new_ids.add(rid)
-            print(f"🧹 Dedup: {len(new_reports)} new, {len(latest_day_reports) - len(new_reports)} duplicates skipped")
+            duplicate_count = len(latest_day_reports) - len(new_reports)
+            print(f"🧹 Dedup: {len(new_reports)} new, {duplicate_count} duplicates skipped")
 
             if not new_reports:
                 print("ℹ️ No new reports to send (all duplicates)")
+                if scheduler:
+                    scheduler.record_run(0, duplicate_count)
                 return True
             
             # Step 4: Send to webhook
@@ -235,14 +340,20 @@ class CallReportSender:
                 # Update dedup state only on successful send
                 sent_ids.update(new_ids)
                 self._save_dedup_state(sent_ids)
+                if scheduler:
+                    scheduler.record_run(len(new_reports), duplicate_count)
                 print("🎉 Call report processing completed successfully!")
             else:
+                if scheduler:
+                    scheduler.record_failure()
                 print("❌ Call report processing failed!")
             
             return success
             
         except Exception as e:
             print(f"❌ Error in process_and_send_reports: {str(e)}")
+            if scheduler:
+                scheduler.record_failure()
             return False
 
 def main():
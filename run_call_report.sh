@@ -41,6 +41,18 @@ if [ -z "$PYTHON_BIN" ]; then
   exit 1
 fi
 
+# Adaptive scheduling: cron fires on a short tick, the scheduler decides
+# whether a full run is due (stdlib only, runs before the venv is touched)
+if [ "${SCHEDULE_ADAPTIVE:-false}" = "true" ]; then
+  set +e
+  "$PYTHON_BIN" "$PROJECT_DIR/adaptive_scheduler.py" check >> "$LOG_DIR/scheduler.log" 2>&1
+  SCHEDULE_CODE=$?
+  set -e
+  if [ "$SCHEDULE_CODE" -eq 3 ]; then
+    exit 0
+  fi
+fi
+
 # Use project-local virtual environment to avoid system package restrictions (PEP 668)
 VENV_DIR="$PROJECT_DIR/.venv"
 VENV_PY="$VENV_DIR/bin/python"
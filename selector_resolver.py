@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import asyncio
+from typing import List, Dict, Optional, Tuple
+
+
+class SelectorResolver:
+    """Resolve UI elements by racing candidate selectors concurrently.
+
+    The winning selector for each (page, step) pair is remembered in a local
+    cache file and tried on its own first on the next run, so a stable layout
+    resolves in milliseconds instead of walking the whole candidate list.
+    Higher-priority candidates are always re-checked, so a generic selector
+    never shadows a more specific one that is present.
+    """
+
+    def __init__(self, cache_path: Optional[str] = None, cached_timeout: int = 1500):
+        # Persistent selector cache file (project-local)
+        self.cache_path = cache_path or os.path.join(os.path.dirname(__file__), 'selector_cache.json')
+        self.cached_timeout = cached_timeout
+        self.selectors: Dict[str, str] = {}
+        self.stats: Dict[str, Dict] = {}
+        self._load_cache()
+
+    @staticmethod
+    def _key(page_name: str, step: str) -> str:
+        return f"{page_name}:{step}"
+
+    def _load_cache(self) -> None:
+        """Load learned selectors and accumulated stats"""
+        try:
+            if os.path.exists(self.cache_path):
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    self.selectors = dict(data.get('selectors') or {})
+                    self.stats = dict(data.get('stats') or {})
+        except Exception as e:
+            print(f"❌ Error loading selector cache: {str(e)}")
+            self.selectors = {}
+            self.stats = {}
+
+    def save_cache(self) -> None:
+        """Persist learned selectors and stats"""
+        try:
+            with open(self.cache_path, 'w', encoding='utf-8') as f:
+                json.dump({'selectors': self.selectors, 'stats': self.stats}, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            print(f"❌ Error saving selector cache: {str(e)}")
+
+    def _record(self, key: str, selector: Optional[str], cache_hit: bool, elapsed_ms: float) -> None:
+        """Update per-step stats and remember the winning selector"""
+        stats = self.stats.setdefault(key, {
+            'resolutions': 0,
+            'cache_hits': 0,
+            'cache_misses': 0,
+            'failures': 0,
+            'total_ms': 0.0,
+            'last_ms': 0.0,
+        })
+        stats['resolutions'] += 1
+        stats['total_ms'] = round(stats['total_ms'] + elapsed_ms, 1)
+        stats['last_ms'] = round(elapsed_ms, 1)
+
+        if selector is None:
+            stats['failures'] += 1
+            print(f"⏱️ [{key}] not resolved after {elapsed_ms:.0f} ms")
+            return
+
+        if cache_hit:
+            stats['cache_hits'] += 1
+        else:
+            stats['cache_misses'] += 1
+            self.selectors[key] = selector
+        source = "cache hit" if cache_hit else "race winner"
+        print(f"⏱️ [{key}] resolved '{selector}' in {elapsed_ms:.0f} ms ({source})")
+
+    @staticmethod
+    async def _query_visible(page, selector: str):
+        """Return the first match for `selector` if it is visible, else None.
+
+        Mirrors the default `wait_for_selector` visibility rule used by the race.
+        """
+        element = await page.query_selector(selector)
+        if element is not None and await element.is_visible():
+            return element
+        return None
+
+    async def _prefer_higher_priority(self, page, selectors: List[str], selector: str, element) -> Tuple[str, object]:
+        """Swap a winner for any higher-priority candidate that is also visible.
+
+        Elements that already exist resolve over separate round-trips, so a
+        generic selector can finish the race before a more specific one.
+        """
+        if selector not in selectors:
+            return selector, element
+        higher = selectors[:selectors.index(selector)]
+        if not higher:
+            return selector, element
+        matches = await asyncio.gather(
+            *(self._query_visible(page, candidate) for candidate in higher),
+            return_exceptions=True
+        )
+        for candidate, match in zip(higher, matches):
+            if match is not None and not isinstance(match, Exception):
+                return candidate, match
+        return selector, element
+
+    async def _race(self, page, selectors: List[str], timeout: int) -> Tuple[Optional[str], object]:
+        """Wait for all selectors concurrently and return the best-priority match.
+
+        The first task to finish ends the race; higher-priority candidates are
+        then checked directly so the listed order is preserved.
+        """
+        tasks = {
+            asyncio.ensure_future(page.wait_for_selector(selector, timeout=timeout)): selector
+            for selector in selectors
+        }
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winners = []
+                for task in done:
+                    if task.cancelled() or task.exception() is not None:
+                        continue
+                    element = task.result()
+                    if element is not None:
+                        winners.append((selectors.index(tasks[task]), tasks[task], element))
+                if winners:
+                    _, selector, element = min(winners, key=lambda w: w[0])
+                    return await self._prefer_higher_priority(page, selectors, selector, element)
+            return None, None
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def resolve(self, page, page_name: str, step: str, selectors: List[str], timeout: int = 5000):
+        """Return the element for the best-priority candidate selector present, or None"""
+        key = self._key(page_name, step)
+        start = time.perf_counter()
+
+        # Ignore a learned selector that is no longer a candidate
+        cached = self.selectors.get(key)
+        if cached in selectors:
+            try:
+                element = await page.wait_for_selector(cached, timeout=min(self.cached_timeout, timeout))
+                if element is not None:
+                    selector, element = await self._prefer_higher_priority(page, selectors, cached, element)
+                    self._record(key, selector, selector == cached, (time.perf_counter() - start) * 1000)
+                    return element
+            except Exception:
+                pass
+
+        # The cached selector stays in the race: it may simply have been slow
+        selector, element = await self._race(page, list(selectors), timeout) if selectors else (None, None)
+        self._record(key, selector, False, (time.perf_counter() - start) * 1000)
+        return element
+
+    async def resolve_all(self, page, page_name: str, step: str, selectors: List[str], min_count: int = 1) -> List:
+        """Return all elements for the first selector that matches at least `min_count` elements"""
+        key = self._key(page_name, step)
+        start = time.perf_counter()
+
+        # Try the learned selector on its own first
+        cached = self.selectors.get(key)
+        if cached in selectors:
+            try:
+                elements = await page.query_selector_all(cached)
+                if len(elements) >= min_count:
+                    self._record(key, cached, True, (time.perf_counter() - start) * 1000)
+                    return elements
+            except Exception:
+                pass
+
+        # Query everything at once but pick in listed priority order
+        results = await asyncio.gather(
+            *(page.query_selector_all(selector) for selector in selectors),
+            return_exceptions=True
+        )
+        for selector, elements in zip(selectors, results):
+            if isinstance(elements, Exception) or len(elements) < min_count:
+                continue
+            self._record(key, selector, False, (time.perf_counter() - start) * 1000)
+            return elements
+
+        self._record(key, None, False, (time.perf_counter() - start) * 1000)
+        return []
+
+    def print_stats(self) -> None:
+        """Print hit rates and average resolution time per step"""
+        if not self.stats:
+            return
+        print("📈 Selector resolution stats:")
+        for key, stats in sorted(self.stats.items()):
+            resolutions = stats.get('resolutions', 0) or 1
+            hit_rate = stats.get('cache_hits', 0) / resolutions * 100
+            avg_ms = stats.get('total_ms', 0.0) / resolutions
+            print(
+                f"  {key}: {hit_rate:.0f}% cache hits, "
+                f"{stats.get('failures', 0)} failures, "
+                f"avg {avg_ms:.0f} ms over {stats.get('resolutions', 0)} resolutions"
+            )
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+# The project is a set of top-level scripts rather than a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import load_settings
+
+# Scheduling values the tests are written against (the documented defaults)
+SCHEDULE_ENV = {
+    'SCHEDULE_BUSINESS_HOURS': '8-18',
+    'SCHEDULE_BUSINESS_DAYS': '0-5',
+    'SCHEDULE_MIN_INTERVAL_MINUTES': '10',
+    'SCHEDULE_BUSINESS_SLO_MINUTES': '30',
+    'SCHEDULE_OFF_HOURS_SLO_MINUTES': '240',
+    'SCHEDULE_FAILURE_RETRY_MINUTES': '15',
+}
+
+
+@pytest.fixture
+def settings_env(monkeypatch):
+    """Reset cached settings so each test reads its own environment.
+
+    The project `.env` is never loaded: `load_dotenv()` would otherwise refill
+    anything removed here with the local deployment's values.
+    """
+    # A None entry makes `from dotenv import load_dotenv` raise ImportError
+    monkeypatch.setitem(sys.modules, 'dotenv', None)
+    for name in list(os.environ):
+        if name.startswith(('SCHEDULE_', 'WEBHOOK_')) or name in ('N8N_WEBHOOK_URL', 'REPORTS_FOLDER'):
+            monkeypatch.delenv(name, raising=False)
+    for name, value in SCHEDULE_ENV.items():
+        monkeypatch.setenv(name, value)
+    load_settings.cache_clear()
+    yield monkeypatch
+    load_settings.cache_clear()
@@ -0,0 +1,109 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from adaptive_scheduler import AdaptiveScheduler
+from report_sender import CallReportSender
+
+# Monday, inside the default 8-18 business hours
+BUSINESS_NOON = datetime(2025, 10, 6, 12, 0)
+# Monday night, outside business hours
+MONDAY_NIGHT = datetime(2025, 10, 6, 22, 0)
+
+CSV_HEADER = "Date & Time,Contact Name,Contact Phone,Duration,Qualified Lead\n"
+
+
+@pytest.fixture
+def scheduler(settings_env, tmp_path):
+    return AdaptiveScheduler(state_path=str(tmp_path / 'schedule_state.json'))
+
+
+def test_first_run_is_due(scheduler):
+    assert scheduler.should_run(BUSINESS_NOON)
+
+
+def test_new_records_keep_minimum_interval(scheduler):
+    next_run = scheduler.record_run(5, 0, now=BUSINESS_NOON)
+
+    assert next_run == BUSINESS_NOON + timedelta(minutes=10)
+    assert not scheduler.should_run(BUSINESS_NOON + timedelta(minutes=5))
+    assert scheduler.should_run(next_run)
+
+
+def test_quiet_runs_back_off_up_to_business_slo(scheduler):
+    now = BUSINESS_NOON
+    intervals = []
+    for _ in range(4):
+        next_run = scheduler.record_run(0, 0, now=now)
+        intervals.append(next_run - now)
+        now = next_run
+
+    assert intervals == [timedelta(minutes=20), timedelta(minutes=30), timedelta(minutes=30), timedelta(minutes=30)]
+
+
+def test_off_hours_wait_stops_at_business_start(scheduler):
+    scheduler.state['quiet_streak'] = 10
+    next_run = scheduler.record_run(0, 0, now=datetime(2025, 10, 7, 6, 0))
+
+    assert next_run == datetime(2025, 10, 7, 8, 0)
+
+
+def test_off_hours_use_longer_slo(scheduler):
+    scheduler.state['quiet_streak'] = 10
+    next_run = scheduler.record_run(0, 0, now=MONDAY_NIGHT)
+
+    assert next_run == MONDAY_NIGHT + timedelta(minutes=240)
+
+
+def test_failure_retries_without_learning_volume(scheduler):
+    next_run = scheduler.record_failure(now=BUSINESS_NOON)
+
+    assert next_run == BUSINESS_NOON + timedelta(minutes=15)
+    assert scheduler.state['hourly_volume'] == {}
+
+
+def test_state_persists_between_instances(scheduler):
+    scheduler.record_run(3, 1, now=BUSINESS_NOON)
+    reloaded = AdaptiveScheduler(state_path=scheduler.state_path)
+
+    assert reloaded.state['last_result'] == {'new': 3, 'duplicates': 1}
+    assert reloaded.state['hourly_volume'] == {'12': 3.0}
+
+
+@pytest.fixture
+def sender(settings_env, tmp_path):
+    reports = tmp_path / 'reports'
+    reports.mkdir()
+    settings_env.setenv('N8N_WEBHOOK_URL', 'http://localhost/webhook')
+    settings_env.setenv('REPORTS_FOLDER', str(reports))
+    return CallReportSender()
+
+
+def test_header_only_export_records_quiet_run(sender, scheduler):
+    with open(f"{sender.reports_folder}/call-reporting.csv", 'w', encoding='utf-8') as f:
+        f.write(CSV_HEADER)
+
+    assert sender.process_and_send_reports(scheduler=scheduler)
+    with open(scheduler.state_path, encoding='utf-8') as f:
+        state = json.load(f)
+    assert state['last_result'] == {'new': 0, 'duplicates': 0}
+    assert state['quiet_streak'] == 1
+    assert 'last_failure' not in state
+
+
+def test_missing_export_records_failure(sender, scheduler):
+    assert not sender.process_and_send_reports(scheduler=scheduler)
+    with open(scheduler.state_path, encoding='utf-8') as f:
+        state = json.load(f)
+    assert 'last_failure' in state
+    assert 'last_run' not in state
+
+
+def test_manual_run_leaves_schedule_untouched(sender, scheduler):
+    with open(f"{sender.reports_folder}/call-reporting.csv", 'w', encoding='utf-8') as f:
+        f.write(CSV_HEADER)
+
+    assert sender.process_and_send_reports()
+    assert not os.path.exists(scheduler.state_path)
@@ -0,0 +1,124 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import app
+
+REQUESTED_AT = datetime(2025, 10, 6, 15, 0, 0, 500000, tzinfo=timezone.utc)
+SENDER = 'noreply@mailbox.gohighlevel.com'
+
+
+def make_email(message_id, recipient, offset_seconds, code):
+    received = REQUESTED_AT.replace(microsecond=0) + timedelta(seconds=offset_seconds)
+    return {
+        'id': message_id,
+        'receivedDateTime': received.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'subject': 'Login security code',
+        'bodyPreview': f'Your login security code: {code}',
+        'from': {'emailAddress': {'address': SENDER}},
+        'toRecipients': [{'emailAddress': {'address': recipient}}],
+    }
+
+
+@pytest.fixture
+def mailbox(monkeypatch):
+    """Stubbed Graph mailbox: tests append emails to the returned list"""
+    emails = []
+    monkeypatch.setattr(app, 'authenticate_with_expiry', lambda: ('token', 3600))
+    monkeypatch.setattr(
+        app, 'get_security_code_emails',
+        lambda token, since=None: [e for e in emails if app.parse_received_datetime(e['receivedDateTime']) >= since]
+    )
+    return emails
+
+
+@pytest.fixture
+def claims_path(tmp_path):
+    return str(tmp_path / 'otp_claims.json')
+
+
+def make_broker(claims_path, clock_skew=10):
+    return app.OtpBroker(poll_interval=0.01, clock_skew=clock_skew, claims_path=claims_path)
+
+
+def request_in_thread(broker, results, name, account, requested_at=REQUESTED_AT, timeout=1):
+    def run():
+        results[name] = broker.request_otp(account, requested_at, timeout=timeout)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_codes_are_matched_by_recipient(mailbox, claims_path):
+    mailbox.extend([
+        make_email('1', 'b@example.com', 1, '222222'),
+        make_email('2', 'a@example.com', 2, '111111'),
+    ])
+    broker = make_broker(claims_path)
+    results = {}
+    threads = [
+        request_in_thread(broker, results, 'a', 'A@example.com'),
+        request_in_thread(broker, results, 'b', 'b@example.com'),
+    ]
+    for thread in threads:
+        thread.join()
+
+    assert results == {'a': '111111', 'b': '222222'}
+
+
+def test_each_email_is_handed_out_once(mailbox, claims_path):
+    mailbox.append(make_email('1', 'a@example.com', 1, '111111'))
+    broker = make_broker(claims_path)
+    results = {}
+    threads = [
+        request_in_thread(broker, results, 'first', 'a@example.com', timeout=0.5),
+        request_in_thread(broker, results, 'second', 'a@example.com', REQUESTED_AT + timedelta(seconds=1), timeout=0.5),
+    ]
+    for thread in threads:
+        thread.join()
+
+    assert results == {'first': '111111', 'second': None}
+
+
+def test_timeout_returns_none(mailbox, claims_path):
+    mailbox.append(make_email('1', 'other@example.com', 1, '111111'))
+
+    assert make_broker(claims_path).request_otp('a@example.com', REQUESTED_AT, timeout=0.2) is None
+
+
+def test_empty_recipient_is_rejected(mailbox, claims_path):
+    with pytest.raises(ValueError):
+        make_broker(claims_path).request_otp('', REQUESTED_AT)
+
+
+def test_clock_skew_tolerates_server_timestamp_before_request(mailbox, claims_path):
+    mailbox.append(make_email('1', 'a@example.com', -2, '111111'))
+
+    assert make_broker(claims_path, clock_skew=10).request_otp('a@example.com', REQUESTED_AT, timeout=0.5) == '111111'
+
+
+def test_emails_older_than_skew_are_ignored(mailbox, claims_path):
+    mailbox.append(make_email('1', 'a@example.com', -30, '111111'))
+
+    assert make_broker(claims_path, clock_skew=10).request_otp('a@example.com', REQUESTED_AT, timeout=0.2) is None
+
+
+def test_oldest_request_wins_across_processes(mailbox, claims_path, monkeypatch):
+    # Process A requested first but cannot reach the mailbox; process B polls
+    # first and must hand the code to A through the shared state
+    process_a = make_broker(claims_path)
+    process_b = make_broker(claims_path)
+    monkeypatch.setattr(process_a, '_get_token', lambda: None)
+    mailbox.append(make_email('1', 'a@example.com', 1, '111111'))
+
+    results = {}
+    thread_a = request_in_thread(process_a, results, 'a', 'a@example.com', timeout=1)
+    # Make sure A's request is registered before B starts polling
+    while not process_a._waiters:
+        pass
+    thread_b = request_in_thread(process_b, results, 'b', 'a@example.com', REQUESTED_AT + timedelta(seconds=1), timeout=0.5)
+    thread_a.join()
+    thread_b.join()
+
+    assert results == {'a': '111111', 'b': None}
@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from config import load_settings
+from report_sender import CallReportSender
+
+REPORTS = [
+    {
+        'Date & Time': '2025-09-29 12:54:06',
+        'Contact Name': 'Lesley Silver',
+        'Marketing Campaign': '-',
+        'First Time': 'No',
+        'Duration': '06:48',
+        'Qualified Lead': 'Yes',
+    },
+    {
+        'Date & Time': '2025-09-30 10:09:23',
+        'Contact Name': 'Kyla Guss',
+        'Marketing Campaign': '',
+        'First Time': 'Yes',
+        'Duration': '01:00:02',
+        'Qualified Lead': 'No',
+    },
+]
+
+
+@pytest.fixture
+def make_sender(settings_env):
+    def make(payload_format='records', fields='', typed=False):
+        settings_env.setenv('N8N_WEBHOOK_URL', 'http://localhost/webhook')
+        settings_env.setenv('WEBHOOK_PAYLOAD_FORMAT', payload_format)
+        settings_env.setenv('WEBHOOK_FIELDS', fields)
+        settings_env.setenv('WEBHOOK_TYPED_VALUES', 'true' if typed else 'false')
+        load_settings.cache_clear()
+        return CallReportSender()
+    return make
+
+
+def test_typed_values(make_sender):
+    sender = make_sender(typed=True)
+    _, records = sender._prepare_records(REPORTS)
+
+    assert records[0]['Duration'] == 408
+    assert records[1]['Duration'] == 3602
+    assert records[0]['Marketing Campaign'] is None
+    assert records[1]['Marketing Campaign'] is None
+    assert records[0]['Qualified Lead'] is True
+    assert records[0]['First Time'] is False
+    assert records[0]['Date & Time'] == '2025-09-29T12:54:06'
+    assert records[0]['Contact Name'] == 'Lesley Silver'
+
+
+def test_records_format_keeps_raw_strings(make_sender):
+    body, content_type = make_sender().build_payload(REPORTS)
+    payload = json.loads(body)
+
+    assert content_type == 'application/json'
+    assert payload['total_reports'] == 2
+    assert payload['reports'] == REPORTS
+
+
+def test_columnar_rows_follow_projection_order(make_sender):
+    sender = make_sender('columnar', fields='Duration,Contact Name', typed=True)
+    body, content_type = sender.build_payload(REPORTS)
+    payload = json.loads(body)
+
+    assert content_type == 'application/json'
+    assert payload['format'] == 'columnar'
+    assert payload['columns'] == ['Duration', 'Contact Name']
+    assert payload['rows'] == [[408, 'Lesley Silver'], [3602, 'Kyla Guss']]
+
+
+def test_ndjson_one_record_per_line(make_sender):
+    sender = make_sender('ndjson', fields='Contact Name,Qualified Lead', typed=True)
+    body, content_type = sender.build_payload(REPORTS)
+    lines = body.decode('utf-8').split('\n')
+
+    assert content_type == 'application/x-ndjson'
+    assert lines[-1] == ''
+    assert [json.loads(line) for line in lines[:-1]] == [
+        {'Contact Name': 'Lesley Silver', 'Qualified Lead': True},
+        {'Contact Name': 'Kyla Guss', 'Qualified Lead': False},
+    ]
+
+
+def test_unknown_projected_column_is_rejected(make_sender):
+    sender = make_sender('columnar', fields='Duraton,Contact Name')
+
+    with pytest.raises(ValueError, match='Duraton'):
+        sender.build_payload(REPORTS)
+
+
+def test_unknown_payload_format_is_rejected(make_sender):
+    with pytest.raises(ValueError, match='WEBHOOK_PAYLOAD_FORMAT'):
+        make_sender('xml')
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from selector_resolver import SelectorResolver
+
+
+class FakeElement:
+    def __init__(self, name, visible=True):
+        self.name = name
+        self.visible = visible
+
+    async def is_visible(self):
+        return self.visible
+
+
+class FakePage:
+    """Minimal Playwright page: `elements` maps selector -> (delay seconds, visible)"""
+
+    def __init__(self, elements, counts=None):
+        self.elements = elements
+        self.counts = counts or {}
+        self.queried_all = []
+
+    async def wait_for_selector(self, selector, timeout):
+        delay, visible = self.elements.get(selector, (None, False))
+        if delay is not None and visible:
+            await asyncio.sleep(delay)
+            return FakeElement(selector)
+        await asyncio.sleep(timeout / 1000)
+        raise TimeoutError(selector)
+
+    async def query_selector(self, selector):
+        if selector in self.elements:
+            return FakeElement(selector, visible=self.elements[selector][1])
+        return None
+
+    async def query_selector_all(self, selector):
+        self.queried_all.append(selector)
+        return [FakeElement(selector)] * self.counts.get(selector, 0)
+
+
+@pytest.fixture
+def resolver(tmp_path):
+    return SelectorResolver(cache_path=str(tmp_path / 'selector_cache.json'))
+
+
+def test_race_prefers_visible_higher_priority(resolver):
+    page = FakePage({'.specific': (0.05, True), '.generic': (0.0, True)})
+    element = asyncio.run(resolver.resolve(page, 'pg', 'btn', ['.specific', '.generic'], timeout=500))
+
+    assert element.name == '.specific'
+    assert resolver.selectors['pg:btn'] == '.specific'
+
+
+def test_hidden_higher_priority_does_not_replace_visible_winner(resolver):
+    page = FakePage({'button[type="submit"]': (None, False), 'button:has-text("Apply")': (0.0, True)})
+    selectors = ['button[type="submit"]', 'button:has-text("Apply")']
+    element = asyncio.run(resolver.resolve(page, 'pg', 'confirm', selectors, timeout=200))
+
+    assert element.name == 'button:has-text("Apply")'
+    assert resolver.selectors['pg:confirm'] == 'button:has-text("Apply")'
+
+    # Cache-hit path applies the same visibility rule
+    element = asyncio.run(resolver.resolve(page, 'pg', 'confirm', selectors, timeout=200))
+    assert element.name == 'button:has-text("Apply")'
+    assert resolver.stats['pg:confirm']['cache_hits'] == 1
+
+
+def test_stale_cached_selector_is_ignored(resolver):
+    resolver.selectors['pg:btn'] = '.removed'
+    page = FakePage({'.removed': (0.0, True), '.current': (0.0, True)})
+    element = asyncio.run(resolver.resolve(page, 'pg', 'btn', ['.current'], timeout=200))
+
+    assert element.name == '.current'
+    assert resolver.selectors['pg:btn'] == '.current'
+
+
+def test_resolve_all_tries_cached_selector_first(resolver):
+    page = FakePage({}, counts={'.first': 2, '.second': 2})
+    asyncio.run(resolver.resolve_all(page, 'pg', 'inputs', ['.first', '.second'], min_count=2))
+    assert resolver.selectors['pg:inputs'] == '.first'
+
+    page = FakePage({}, counts={'.first': 2, '.second': 2})
+    elements = asyncio.run(resolver.resolve_all(page, 'pg', 'inputs', ['.first', '.second'], min_count=2))
+
+    assert len(elements) == 2
+    assert page.queried_all == ['.first']
+    assert resolver.stats['pg:inputs']['cache_hits'] == 1
+
+
+def test_resolve_all_falls_back_when_cached_selector_misses(resolver):
+    resolver.selectors['pg:inputs'] = '.first'
+    page = FakePage({}, counts={'.first': 1, '.second': 2})
+    elements = asyncio.run(resolver.resolve_all(page, 'pg', 'inputs', ['.first', '.second'], min_count=2))
+
+    assert elements[0].name == '.second'
+    assert resolver.selectors['pg:inputs'] == '.second'
+    assert resolver.stats['pg:inputs']['cache_misses'] == 1